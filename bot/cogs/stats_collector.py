@@ -1,12 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from collections import Counter, OrderedDict
-from datetime import datetime
+import logging.handlers
 from typing import Optional
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from bot.config import Config
 from bot.services.aggregation import AggregationService
@@ -18,23 +18,33 @@ _guild_join_type = getattr(discord.MessageType, "guild_member_join", None)
 if _guild_join_type:
     JOIN_MESSAGE_TYPES.add(_guild_join_type)
 
+# Cached author for messages we failed to read; Discord never assigns user id 0
+UNKNOWN_AUTHOR = 0
+
+# Queued messages that trigger a flush before the next scheduled one
+FLUSH_THRESHOLD = 500
+
 
 class MessageAuthorCache:
     def __init__(self, max_size: int = 5000):
         self.max_size = max_size
-        self._data: OrderedDict[int, int] = OrderedDict()
+        # Plain dicts keep insertion order, so the first key is the least recently used
+        self._data: dict[int, int] = {}
 
     def put(self, message_id: int, author_id: int) -> None:
-        if message_id in self._data:
-            self._data.move_to_end(message_id)
+        # New messages are the common case, so assign first and detect re-inserts by size
+        size = len(self._data)
         self._data[message_id] = author_id
-        if len(self._data) > self.max_size:
-            self._data.popitem(last=False)
+        if len(self._data) == size:
+            del self._data[message_id]
+            self._data[message_id] = author_id
+        elif size >= self.max_size:
+            del self._data[next(iter(self._data))]
 
     def get(self, message_id: int) -> Optional[int]:
-        author = self._data.get(message_id)
+        author = self._data.pop(message_id, None)
         if author is not None:
-            self._data.move_to_end(message_id)
+            self._data[message_id] = author
         return author
 
 
@@ -43,28 +53,66 @@ class StatsCollector(commands.Cog):
         self.bot = bot
         self.config = config
         self.aggregation = aggregation
+        self._guild_id_filter = config.guild_id
         self.cache = MessageAuthorCache()
-        self.user_counts: Counter[int] = Counter()
+        self.user_counts: dict[int, int] = {}
         self._user_count_logger = logging.getLogger("user_counts")
         self._configure_user_logger()
+        self._early_flush: Optional[asyncio.Task] = None
+        self.flush_pending_messages.start()
+
+    async def cog_unload(self):
+        # Let an in-flight flush finish, then persist whatever is still queued
+        self.flush_pending_messages.stop()
+        try:
+            await self.aggregation.flush_messages()
+        except Exception:
+            logger.exception("Failed to flush buffered messages on unload")
+        # Push buffered user-count lines to disk; logging.shutdown covers process exit
+        for handler in self._user_count_logger.handlers:
+            handler.flush()
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild:
+        author = message.author
+        guild = message.guild
+        if author.bot or guild is None:
             return
-        if self.config.guild_id and message.guild.id != self.config.guild_id:
+        guild_id = guild.id
+        filter_gid = self._guild_id_filter
+        if filter_gid and guild_id != filter_gid:
             return
         if message.type in JOIN_MESSAGE_TYPES:
             return
+        author_id = author.id
+        created_at = message.created_at
         try:
-            await self.aggregation.record_message(message.guild.id, message.author.id, message.created_at)
-            self.cache.put(message.id, message.author.id)
-            total = self._increment_user_count(message.author.id)
+            self.aggregation.record_message_sync(guild_id, author_id, created_at)
+            if self.aggregation.pending_message_count >= FLUSH_THRESHOLD and (
+                self._early_flush is None or self._early_flush.done()
+            ):
+                self._early_flush = asyncio.create_task(self._flush_messages())
+            self.cache.put(message.id, author_id)
+            total = self._increment_user_count(author_id)
+            # Pre-formatted so the handler does no %-interpolation or asctime work per record;
+            # the stamp is the message's UTC creation time, built field by field instead of via strftime
+            ts = created_at
             self._user_count_logger.info(
-                "user_id=%s username=%s message_count=%s", message.author.id, message.author.name, total
+                f"{ts.year:04d}-{ts.month:02d}-{ts.day:02d} {ts.hour:02d}:{ts.minute:02d}:{ts.second:02d} "
+                f"user_id={author_id} username={author.name} message_count={total}"
             )
         except Exception:
-            logger.exception("Failed to record message for guild %s", message.guild.id)
+            logger.exception("Failed to record message for guild %s", guild_id)
+
+    @tasks.loop(seconds=0.25)
+    async def flush_pending_messages(self):
+        await self._flush_messages()
+
+    async def _flush_messages(self) -> None:
+        try:
+            await self.aggregation.flush_messages()
+        except Exception:
+            logger.exception("Failed to flush buffered messages")
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -77,25 +125,26 @@ class StatsCollector(commands.Cog):
     async def _handle_reaction(self, payload: discord.RawReactionActionEvent, is_add: bool) -> None:
         if payload.guild_id is None:
             return
-        if self.config.guild_id and payload.guild_id != self.config.guild_id:
+        gid = self._guild_id_filter
+        if gid and payload.guild_id != gid:
             return
         if self.bot.user and payload.user_id == self.bot.user.id:
             return
 
         author_id = await self._get_message_author(payload)
-        ts = datetime.utcnow()
         try:
+            # Reactions are recorded at arrival time, which the service reads from its per-second clock
             if is_add:
-                await self.aggregation.record_reaction_add(payload.guild_id, payload.user_id, author_id, ts)
+                await self.aggregation.record_reaction_add(payload.guild_id, payload.user_id, author_id)
             else:
-                await self.aggregation.record_reaction_remove(payload.guild_id, payload.user_id, author_id, ts)
+                await self.aggregation.record_reaction_remove(payload.guild_id, payload.user_id, author_id)
         except Exception:
             logger.exception("Failed to record reaction event for guild %s", payload.guild_id)
 
     async def _get_message_author(self, payload: discord.RawReactionActionEvent) -> Optional[int]:
         cached = self.cache.get(payload.message_id)
         if cached is not None:
-            return cached
+            return cached if cached != UNKNOWN_AUTHOR else None
 
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
@@ -115,8 +164,10 @@ class StatsCollector(commands.Cog):
             return message.author.id
         except discord.Forbidden:
             logger.warning("Missing permissions to read message %s in channel %s", payload.message_id, payload.channel_id)
+            self.cache.put(payload.message_id, UNKNOWN_AUTHOR)
         except discord.NotFound:
             logger.info("Message %s not found for reaction event", payload.message_id)
+            self.cache.put(payload.message_id, UNKNOWN_AUTHOR)
         except Exception:
             logger.exception("Failed to fetch message %s for reaction event", payload.message_id)
         return None
@@ -124,15 +175,21 @@ class StatsCollector(commands.Cog):
     def _configure_user_logger(self) -> None:
         if self._user_count_logger.handlers:
             return
-        handler = logging.FileHandler("user_counts.log", mode="w")
-        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        # Append across restarts and rotate so the file stays small
+        file_handler = logging.handlers.RotatingFileHandler(
+            "user_counts.log", mode="a", maxBytes=16 * 1024 * 1024, backupCount=3, delay=True
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        # Buffer records so a busy guild does not pay a write syscall per message
+        handler = logging.handlers.MemoryHandler(capacity=512, flushLevel=logging.ERROR, target=file_handler)
         self._user_count_logger.addHandler(handler)
         self._user_count_logger.setLevel(logging.INFO)
         self._user_count_logger.propagate = False
 
     def _increment_user_count(self, user_id: int) -> int:
-        self.user_counts[user_id] += 1
-        return self.user_counts[user_id]
+        count = self.user_counts.get(user_id, 0) + 1
+        self.user_counts[user_id] = count
+        return count
 
 
 async def setup(bot: commands.Bot):
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 from datetime import datetime, time, timedelta
-from typing import Optional
+from time import monotonic
+from typing import Dict, Optional, Tuple
 from zoneinfo import ZoneInfo
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from bot.config import Config
 from bot.services.aggregation import AggregationService
@@ -16,6 +18,9 @@ from bot.services.renderer import StatsRenderer
 
 logger = logging.getLogger(__name__)
 
+# Unforced refreshes (gateway reconnects) within this many seconds of the last one are skipped
+REFRESH_DEBOUNCE_SECONDS = 300
+
 
 class StatsRefreshView(discord.ui.View):
     """Persistent view with a button to refresh the stats embed."""
@@ -29,11 +34,12 @@ class StatsRefreshView(discord.ui.View):
         if not interaction.guild:
             await interaction.response.send_message("Use this button inside a server.", ephemeral=True)
             return
-        if self.cog.config.guild_id and interaction.guild.id != self.cog.config.guild_id:
+        gid = self.cog._guild_id_filter
+        if gid and interaction.guild.id != gid:
             await interaction.response.send_message("This bot is scoped to a different server.", ephemeral=True)
             return
         await interaction.response.defer(ephemeral=True, thinking=True)
-        await self.cog.refresh_stats_message()
+        await self.cog.refresh_stats_message(force=True)
         await interaction.followup.send("Statistics refreshed.", ephemeral=True)
 
 
@@ -43,34 +49,57 @@ class StatsCommands(commands.Cog):
         self.config = config
         self.aggregation = aggregation
         self.renderer = renderer
+        self._guild_id_filter = config.guild_id
+        self._guild: Optional[discord.Guild] = None
         self.refresh_view = StatsRefreshView(self)
         self.bot.add_view(self.refresh_view)
-        self._synced = False
         self._kyiv_tz = ZoneInfo("Europe/Kyiv")
+        self._daily_task: Optional[asyncio.Task] = None
         self._weekly_task: Optional[asyncio.Task] = None
         self._monthly_task: Optional[asyncio.Task] = None
         self._schedules_started = False
-        self.daily_refresh.start()
+        self._refresh_inflight: Optional[asyncio.Future] = None
+        self._refresh_inflight_forced = False
+        self._last_refresh_monotonic: Optional[float] = None
+        self._last_embed_hash: Optional[int] = None
+        # (channel_id, message_id) last persisted for the stats message
+        self._stored_stats_location: Optional[Tuple[int, int]] = None
+        # Discord objects reused across refreshes to skip REST fetches, keyed by guild id
+        self._cached_channels: Dict[int, discord.TextChannel] = {}
+        self._cached_messages: Dict[int, discord.Message] = {}
 
     def cog_unload(self):
-        self.daily_refresh.cancel()
-        for task in (self._weekly_task, self._monthly_task):
+        for task in (self._daily_task, self._weekly_task, self._monthly_task):
             if task and not task.done():
                 task.cancel()
+        self._daily_task = None
+        self._weekly_task = None
+        self._monthly_task = None
+        self._schedules_started = False
 
     @commands.Cog.listener()
     async def on_ready(self):
-        await self._sync_commands()
+        # The target guild does not change at runtime; resolve it once per (re)connect
+        self._guild = self._resolve_target_guild()
         if not self._schedules_started:
             self._start_schedules()
         await self.refresh_stats_message()
 
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        # Forget a deleted stats message so the next refresh recreates it even if stats are unchanged
+        cached = self._cached_messages.get(payload.guild_id) if payload.guild_id else None
+        if cached is not None and cached.id == payload.message_id:
+            del self._cached_messages[payload.guild_id]
+            self._last_embed_hash = None
+
     @app_commands.command(name="my_stats", description="Show your recent Discord activity")
     async def my_stats(self, interaction: discord.Interaction):
         if not interaction.guild:
             await interaction.response.send_message("Use this command inside a server.", ephemeral=True)
             return
-        if self.config.guild_id and interaction.guild.id != self.config.guild_id:
+        gid = self._guild_id_filter
+        if gid and interaction.guild.id != gid:
             await interaction.response.send_message("This bot is scoped to a different server.", ephemeral=True)
             return
 
@@ -84,55 +113,84 @@ class StatsCommands(commands.Cog):
         if not interaction.guild:
             await interaction.response.send_message("Use this command inside a server.", ephemeral=True)
             return
-        if self.config.guild_id and interaction.guild.id != self.config.guild_id:
+        gid = self._guild_id_filter
+        if gid and interaction.guild.id != gid:
             await interaction.response.send_message("This bot is scoped to a different server.", ephemeral=True)
             return
 
         await interaction.response.defer(ephemeral=True, thinking=True)
-        await self.refresh_stats_message()
+        await self.refresh_stats_message(force=True)
         await interaction.followup.send("Statistics refreshed.", ephemeral=True)
 
-    @tasks.loop(hours=24)
-    async def daily_refresh(self):
-        try:
-            await self.refresh_stats_message()
-        except Exception:
-            logger.exception("Daily stats refresh failed")
-
-    @daily_refresh.before_loop
-    async def before_daily_refresh(self):
+    async def _daily_refresh(self):
         await self.bot.wait_until_ready()
-        await discord.utils.sleep_until(self._next_kyiv_midnight())
+        while not self.bot.is_closed():
+            try:
+                # Recompute the boundary every run so slow refreshes never drift the schedule
+                await discord.utils.sleep_until(self._next_kyiv_midnight())
+                try:
+                    await self.aggregation.prune_daily_stats()
+                except Exception:
+                    logger.exception("Pruning daily stats failed")
+                await self.refresh_stats_message(force=True)
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                logger.exception("Daily stats refresh failed")
 
     def _start_schedules(self) -> None:
         # Guard against multiple on_ready calls
         self._schedules_started = True
+        self._daily_task = asyncio.create_task(self._daily_refresh())
         self._weekly_task = asyncio.create_task(self._weekly_refresh())
         self._monthly_task = asyncio.create_task(self._monthly_refresh())
 
     async def _weekly_refresh(self):
         await self.bot.wait_until_ready()
+        target = self._next_monday_start()
         while not self.bot.is_closed():
             try:
-                await discord.utils.sleep_until(self._next_monday_start())
-                await self.refresh_stats_message()
+                await discord.utils.sleep_until(target)
+                await self.refresh_stats_message(force=True)
             except asyncio.CancelledError:
                 break
             except Exception:
                 logger.exception("Weekly stats refresh failed")
+            target = self._next_monday_start()
 
     async def _monthly_refresh(self):
         await self.bot.wait_until_ready()
+        target = self._next_month_start()
         while not self.bot.is_closed():
             try:
-                await discord.utils.sleep_until(self._next_month_start())
-                await self.refresh_stats_message()
+                await discord.utils.sleep_until(target)
+                await self.refresh_stats_message(force=True)
             except asyncio.CancelledError:
                 break
             except Exception:
                 logger.exception("Monthly stats refresh failed")
+            target = self._next_month_start()
 
-    async def refresh_stats_message(self):
+    async def refresh_stats_message(self, force: bool = False):
+        last = self._last_refresh_monotonic
+        if not force and last is not None and monotonic() - last < REFRESH_DEBOUNCE_SECONDS:
+            logger.debug("Skipping stats refresh; last one ran %.0fs ago", monotonic() - last)
+            return
+        if force and self._refresh_inflight is not None and not self._refresh_inflight_forced:
+            # An unforced refresh may skip an unchanged edit, so a forced caller runs its own after it
+            await asyncio.shield(self._refresh_inflight)
+        # Schedules, the button and /stat_refresh can overlap; they share one in-flight refresh
+        if self._refresh_inflight is None:
+            self._last_refresh_monotonic = monotonic()
+            self._refresh_inflight_forced = force
+            self._refresh_inflight = asyncio.ensure_future(self._refresh_stats_message(force))
+            self._refresh_inflight.add_done_callback(self._clear_refresh_inflight)
+        await asyncio.shield(self._refresh_inflight)
+
+    def _clear_refresh_inflight(self, _: asyncio.Future) -> None:
+        self._refresh_inflight = None
+
+    async def _refresh_stats_message(self, force: bool = False):
         guild = self._target_guild()
         if not guild:
             logger.warning("No guild available to refresh stats")
@@ -141,9 +199,14 @@ class StatsCommands(commands.Cog):
         last_updated = self._kyiv_now()
         window_days_24h = 2  # Use two calendar days to approximate the last 24h
         # Use two calendar days to approximate the last 24h window with day-level buckets
-        stats_24h = await self.aggregation.get_server_windows(guild.id, window_days_24h)
-        stats_7d = await self.aggregation.get_server_windows(guild.id, 7)
-        stats_30d = await self.aggregation.get_server_windows(guild.id, 30)
+        # The queries are independent, so overlap their round-trips
+        windows, top_users_24h, top_users_7d, top_users_30d = await asyncio.gather(
+            self.aggregation.get_server_windows_multi(guild.id, [window_days_24h, 7, 30]),
+            self.aggregation.get_top_users_by_messages(guild.id, window_days_24h, limit=5),
+            self.aggregation.get_top_users_by_messages(guild.id, 7, limit=5),
+            self.aggregation.get_top_users_by_messages(guild.id, 30, limit=5),
+        )
+        stats_24h, stats_7d, stats_30d = windows[window_days_24h], windows[7], windows[30]
         messages = {
             "messages_24h": stats_24h.get("messages", 0),
             "active_24h": stats_24h.get("active_users", 0),
@@ -154,9 +217,6 @@ class StatsCommands(commands.Cog):
         }
         reactions_7d = stats_7d.get("reactions", 0)
         reactions_30d = stats_30d.get("reactions", 0)
-        top_users_24h = await self.aggregation.get_top_users_by_messages(guild.id, window_days_24h, limit=5)
-        top_users_7d = await self.aggregation.get_top_users_by_messages(guild.id, 7, limit=5)
-        top_users_30d = await self.aggregation.get_top_users_by_messages(guild.id, 30, limit=5)
 
         embed = await self.renderer.server_embed(
             guild, messages, reactions_7d, reactions_30d, top_users_24h, top_users_7d, top_users_30d, last_updated
@@ -166,74 +226,85 @@ class StatsCommands(commands.Cog):
         if not channel:
             return
 
-        await self.aggregation.set_stats_channel_id(guild.id, channel.id)
-
-        try:
-            message = await self._get_existing_message(channel)
-        except Exception:
-            logger.exception("Aborting stats update because existing message fetch failed")
-            return
+        message = self._cached_messages.get(guild.id)
+        if message is None:
+            try:
+                message = await self._get_existing_message(channel)
+            except Exception:
+                logger.exception("Aborting stats update because the stored message id lookup failed")
+                return
+        fingerprint = self._embed_fingerprint(embed)
         try:
             if message:
-                await message.edit(embed=embed, view=self.refresh_view)
-            else:
-                sent = await channel.send(embed=embed, view=self.refresh_view)
-                await self.aggregation.set_stats_message_id(guild.id, sent.id)
+                # Only unforced refreshes skip; forced ones must bump the "Last update" footer
+                if not force and fingerprint == self._last_embed_hash:
+                    logger.debug("Stats unchanged; skipping message edit")
+                    return
+                try:
+                    message = await message.edit(embed=embed, view=self.refresh_view)
+                except discord.NotFound:
+                    logger.info("Stored stats message not found. Recreating.")
+                    message = None
+            if message is None:
+                message = await channel.send(embed=embed, view=self.refresh_view)
+            self._cached_messages[guild.id] = message
+            self._last_embed_hash = fingerprint
+            location = (channel.id, message.id)
+            if location != self._stored_stats_location:
+                await self.aggregation.set_stats_message(guild.id, channel.id, message.id)
+                self._stored_stats_location = location
         except discord.Forbidden:
             logger.warning("Missing permissions to edit or send stats message in %s", channel.id)
+        except discord.NotFound:
+            logger.warning("Stats channel %s not found; dropping cached channel", channel.id)
+            self._cached_channels.pop(guild.id, None)
         except Exception:
             logger.exception("Failed to update stats message")
 
+    @staticmethod
+    def _embed_fingerprint(embed: discord.Embed) -> int:
+        # The footer only carries the update time, so it is left out of the comparison
+        payload = embed.to_dict()
+        payload.pop("footer", None)
+        return hash(json.dumps(payload, sort_keys=True))
+
     def _target_guild(self) -> Optional[discord.Guild]:
-        if self.config.guild_id:
-            return self.bot.get_guild(self.config.guild_id)
+        return self._guild
+
+    def _resolve_target_guild(self) -> Optional[discord.Guild]:
+        if self._guild_id_filter:
+            return self.bot.get_guild(self._guild_id_filter)
         # fallback to the first guild the bot is in
         if self.bot.guilds:
             return self.bot.guilds[0]
         return None
 
-    async def _sync_commands(self):
-        if self._synced:
-            return
-        try:
-            if self.config.guild_id:
-                guild_obj = discord.Object(id=self.config.guild_id)
-                await self.bot.tree.sync(guild=guild_obj)
-            else:
-                await self.bot.tree.sync()
-            self._synced = True
-            logger.info("Slash commands synced")
-        except Exception:
-            logger.exception("Failed to sync commands")
-
     async def _get_stats_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
+        cached = self._cached_channels.get(guild.id)
+        if cached is not None:
+            return cached
         channel = guild.get_channel(self.config.stats_channel_id)
         if channel and isinstance(channel, discord.TextChannel):
+            self._cached_channels[guild.id] = channel
             return channel
         try:
             fetched = await guild.fetch_channel(self.config.stats_channel_id)
-            return fetched if isinstance(fetched, discord.TextChannel) else None
+            if isinstance(fetched, discord.TextChannel):
+                self._cached_channels[guild.id] = fetched
+                return fetched
+            return None
         except discord.Forbidden:
             logger.warning("Missing permissions to fetch stats channel %s", self.config.stats_channel_id)
         except discord.HTTPException:
             logger.exception("Failed to fetch stats channel %s", self.config.stats_channel_id)
         return None
 
-    async def _get_existing_message(self, channel: discord.TextChannel) -> Optional[discord.Message]:
+    async def _get_existing_message(self, channel: discord.TextChannel) -> Optional[discord.PartialMessage]:
         message_id = await self.aggregation.get_stats_message_id(channel.guild.id)
         if not message_id:
             return None
-        try:
-            return await channel.fetch_message(message_id)
-        except discord.NotFound:
-            logger.info("Stored stats message not found. Recreating.")
-            return None
-        except discord.Forbidden:
-            logger.warning("Missing permissions to fetch stats message in %s", channel.id)
-            raise
-        except Exception:
-            logger.exception("Failed to fetch stats message %s", message_id)
-            raise
+        # Editing a partial message sends the PATCH directly; a deleted message surfaces as NotFound on edit
+        return channel.get_partial_message(message_id)
 
     def _kyiv_now(self) -> datetime:
         return datetime.now(self._kyiv_tz)
@@ -252,13 +323,16 @@ class StatsCommands(commands.Cog):
         return datetime.combine(target_date, time(0, 0, 10), tzinfo=self._kyiv_tz)
 
     def _next_month_start(self) -> datetime:
-        now = self._kyiv_now()
-        first_this_month = datetime(now.year, now.month, 1, 0, 0, 15, tzinfo=self._kyiv_tz)
-        if now < first_this_month:
-            return first_this_month
-        year = now.year + (1 if now.month == 12 else 0)
-        month = 1 if now.month == 12 else now.month + 1
-        return datetime(year, month, 1, 0, 0, 15, tzinfo=self._kyiv_tz)
+        tz = self._kyiv_tz
+        now = datetime.now(tz)
+        # Only the first 15 seconds of the 1st still precede this month's run
+        if now.day == 1 and (now.hour, now.minute, now.second) < (0, 0, 15):
+            year, month = now.year, now.month
+        elif now.month == 12:
+            year, month = now.year + 1, 1
+        else:
+            year, month = now.year, now.month + 1
+        return datetime(year, month, 1, 0, 0, 15, tzinfo=tz)
 
 
 async def setup(bot: commands.Bot):
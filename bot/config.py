@@ -3,8 +3,6 @@ import os
 from dataclasses import dataclass
 from typing import Optional
 
-from dotenv import load_dotenv
-
 @dataclass
 class Config:
     discord_token: str
@@ -19,12 +17,21 @@ class Config:
     mongo_app_password: Optional[str] = None
     mongo_root_uri: Optional[str] = None
     mongo_root_auth_db: str = "admin"
+    mongo_active_users_collection: str = "active_users"
+    mongo_max_pool_size: int = 50
+    mongo_min_pool_size: int = 5
+    mongo_max_idle_time_ms: int = 60000
+    mongo_compressors: str = "zlib"
     log_level: int = logging.INFO
 
 
 def load_config() -> Config:
-    # Load variables from a local .env file if present
-    load_dotenv()
+    # Load variables from a local .env file if present; deployments that inject the
+    # environment directly can set SKIP_DOTENV to avoid importing and searching for it
+    if not os.getenv("SKIP_DOTENV"):
+        from dotenv import load_dotenv
+
+        load_dotenv(override=False)
 
     token = os.getenv("DISCORD_TOKEN")
     mongo_user = os.getenv("MONGO_APP_USERNAME")
@@ -39,10 +46,17 @@ def load_config() -> Config:
     mongo_users_collection = os.getenv("MONGO_USERS_COLLECTION", default_collection or "users")
     mongo_servers_collection = os.getenv("MONGO_SERVERS_COLLECTION", default_collection or "servers")
     mongo_meta_collection = os.getenv("MONGO_META_COLLECTION", default_collection or "meta")
+    # Never shares MONGO_COLLECTION: its TTL index would expire every document in a shared collection
+    mongo_active_users_collection = os.getenv("MONGO_ACTIVE_USERS_COLLECTION", "active_users")
     stats_channel = os.getenv("STATS_CHANNEL_ID")
     guild_id = os.getenv("GUILD_ID")
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 
+    mongo_max_pool_size = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    mongo_min_pool_size = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+    mongo_max_idle_time_ms = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    mongo_compressors = os.getenv("MONGO_COMPRESSORS", "zlib")
+
     mongo_host = os.getenv("MONGO_HOST", "localhost")
     mongo_port = os.getenv("MONGO_PORT", "27017")
     if not mongo_uri:
@@ -87,5 +101,10 @@ def load_config() -> Config:
         mongo_app_password=mongo_password,
         mongo_root_uri=mongo_root_uri,
         mongo_root_auth_db=mongo_root_auth_db,
+        mongo_active_users_collection=mongo_active_users_collection,
+        mongo_max_pool_size=mongo_max_pool_size,
+        mongo_min_pool_size=mongo_min_pool_size,
+        mongo_max_idle_time_ms=mongo_max_idle_time_ms,
+        mongo_compressors=mongo_compressors,
         log_level=getattr(logging, log_level, logging.INFO),
     )
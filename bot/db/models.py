@@ -1,30 +1,71 @@
 from __future__ import annotations
 
+import functools
+import time
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Dict, Iterable, List, Optional, Set
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
 DATE_FORMAT = "%Y-%m-%d"
 
 
-def date_key(ts: Optional[datetime] = None) -> str:
-    ts = ts or datetime.utcnow()
-    return ts.strftime(DATE_FORMAT)
+# Last UTC day number seen by epoch_date_key and its formatted key
+_day_key_cache: list = [-1, ""]
+# Last whole UTC second seen by utc_day_and_now, its day key and naive UTC datetime
+_now_cache: list = [-1, "", None]
 
 
-def date_range(days: int, now: Optional[datetime] = None) -> Set[str]:
+def date_key(ts: Optional[datetime] = None) -> str:
+    if ts is None:
+        return epoch_date_key(time.time())
+    # Same output as strftime(DATE_FORMAT) without re-parsing the format on every call
+    return f"{ts.year:04d}-{ts.month:02d}-{ts.day:02d}"
+
+
+def epoch_date_key(seconds: float) -> str:
+    """Return the UTC date key for a Unix timestamp, formatting only when the day changes."""
+    day_number = int(seconds // 86400)
+    if day_number != _day_key_cache[0]:
+        day_start = datetime.fromtimestamp(day_number * 86400, timezone.utc)
+        _day_key_cache[0] = day_number
+        _day_key_cache[1] = date_key(day_start)
+    return _day_key_cache[1]
+
+
+def utc_day_and_now() -> tuple[str, datetime]:
+    """Return today's UTC date key and a naive UTC datetime, rebuilt at most once per second."""
+    seconds = time.time()
+    whole = int(seconds)
+    if whole != _now_cache[0]:
+        _now_cache[0] = whole
+        _now_cache[1] = epoch_date_key(seconds)
+        _now_cache[2] = datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    return _now_cache[1], _now_cache[2]
+
+
+def date_range(days: int, now: Optional[datetime] = None) -> set[str]:
     """Return date keys (YYYY-MM-DD) for the last `days` days inclusive."""
     now = now or datetime.utcnow()
-    return {date_key(now - timedelta(days=delta)) for delta in range(days)}
+    return set(_date_keys(date_key(now), days))
+
 
+@functools.lru_cache(maxsize=64)
+def _date_keys(today: str, days: int) -> tuple[str, ...]:
+    # Keyed by today's date key, so cached entries go stale naturally at midnight
+    end = datetime.strptime(today, DATE_FORMAT)
+    return tuple(date_key(end - timedelta(days=delta)) for delta in range(days))
 
-@dataclass
+
+@dataclass(slots=True)
 class DailyUserStats:
     messages: int = 0
     reactions_given: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class UserDocument:
     _id: str
     guild_id: int
@@ -32,30 +73,39 @@ class UserDocument:
     total_messages: int = 0
     reactions_given: int = 0
     reactions_received: int = 0
-    daily_stats: Dict[str, DailyUserStats] = field(default_factory=dict)
+    daily_stats: dict[str, DailyUserStats] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
 
 
-@dataclass
+@dataclass(slots=True)
 class DailyServerStats:
     messages: int = 0
     reactions: int = 0
-    active_users: List[int] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ServerDocument:
     _id: str
     guild_id: int
     stats_channel_id: Optional[int] = None
     stats_message_id: Optional[int] = None
-    daily_stats: Dict[str, DailyServerStats] = field(default_factory=dict)
+    daily_stats: dict[str, DailyServerStats] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
 
 
-@dataclass
+@dataclass(slots=True)
+class ActiveUserDocument:
+    # One document per (guild, day, user), so distinct counts never grow the server document
+    _id: str
+    guild_id: int
+    day: str
+    user_id: int
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass(slots=True)
 class MetaDocument:
     _id: str
     guild_id: Optional[int] = None
@@ -68,7 +118,10 @@ def user_key(guild_id: int, user_id: int) -> str:
     return f"{guild_id}:{user_id}"
 
 
+def active_user_key(guild_id: int, day: str, user_id: int) -> str:
+    return f"{guild_id}:{day}:{user_id}"
+
+
 def relevant_dates(days: int, now: Optional[datetime] = None) -> Iterable[str]:
     now = now or datetime.utcnow()
-    for delta in range(days):
-        yield date_key(now - timedelta(days=delta))
+    return iter(_date_keys(date_key(now), days))
@@ -8,15 +8,36 @@ logger = logging.getLogger(__name__)
 
 
 class Mongo:
-    def __init__(self, uri: str, db_name: str = "discord_stats"):
+    def __init__(
+        self,
+        uri: str,
+        db_name: str = "discord_stats",
+        max_pool_size: int = 50,
+        min_pool_size: int = 5,
+        max_idle_time_ms: int = 60000,
+        compressors: str = "zlib",
+    ):
         self._uri = uri
         self._db_name = db_name
+        self._pool_options = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "maxIdleTimeMS": max_idle_time_ms,
+        }
+        if compressors:
+            self._pool_options["compressors"] = compressors
         self._client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
 
     def client(self) -> motor.motor_asyncio.AsyncIOMotorClient:
         if self._client is None:
             logger.info("Connecting to MongoDB at %s", self._uri)
-            self._client = motor.motor_asyncio.AsyncIOMotorClient(self._uri, uuidRepresentation="standard")
+            self._client = motor.motor_asyncio.AsyncIOMotorClient(
+                self._uri,
+                uuidRepresentation="standard",
+                serverSelectionTimeoutMS=5000,
+                retryWrites=True,
+                **self._pool_options,
+            )
         return self._client
 
     def db(self):
@@ -38,7 +59,13 @@ async def ensure_app_user(
     """Create the application user if it does not exist (idempotent)."""
     client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
     try:
-        client = motor.motor_asyncio.AsyncIOMotorClient(root_uri, uuidRepresentation="standard")
+        # Short timeouts: this runs once at startup and should fail fast on a bad root URI
+        client = motor.motor_asyncio.AsyncIOMotorClient(
+            root_uri,
+            uuidRepresentation="standard",
+            serverSelectionTimeoutMS=3000,
+            connectTimeoutMS=3000,
+        )
         admin_db = client.get_database(root_auth_db)
         # Check if user already exists
         info = await admin_db.command({"usersInfo": {"user": username, "db": root_auth_db}})
@@ -11,6 +11,31 @@ from bot.db.mongo import Mongo, ensure_app_user
 from bot.services.aggregation import AggregationService
 from bot.services.renderer import StatsRenderer
 
+logger = logging.getLogger(__name__)
+
+
+class StatsBot(commands.Bot):
+    def __init__(self, config: Config, **kwargs):
+        super().__init__(**kwargs)
+        self.config = config
+        self._synced = False
+
+    async def setup_hook(self) -> None:
+        # Runs once before the first gateway connection, so RESUMEs and reconnects never re-sync
+        if self._synced:
+            return
+        try:
+            if self.config.guild_id:
+                guild_obj = discord.Object(id=self.config.guild_id)
+                self.tree.copy_global_to(guild=guild_obj)
+                await self.tree.sync(guild=guild_obj)
+            else:
+                await self.tree.sync()
+            self._synced = True
+            logger.info("Slash commands synced")
+        except Exception:
+            logger.exception("Failed to sync commands")
+
 
 def setup_logging(level: int) -> None:
     logging.basicConfig(
@@ -19,13 +44,13 @@ def setup_logging(level: int) -> None:
     )
 
 
-def create_bot(config: Config) -> commands.Bot:
+def create_bot(config: Config) -> StatsBot:
     intents = discord.Intents.default()
     intents.message_content = False
     intents.messages = True
     intents.guilds = True
     intents.reactions = True
-    bot = commands.Bot(command_prefix="!", intents=intents)
+    bot = StatsBot(config, command_prefix="!", intents=intents)
     return bot
 
 
@@ -35,8 +60,13 @@ async def start_bot():
 
     bot = create_bot(config)
 
-    # Optionally bootstrap the app user if root credentials are available
-    if config.mongo_root_uri and config.mongo_app_username and config.mongo_app_password:
+    # Optionally bootstrap the app user if separate root credentials are available
+    if (
+        config.mongo_root_uri
+        and config.mongo_root_uri != config.mongo_uri
+        and config.mongo_app_username
+        and config.mongo_app_password
+    ):
         await ensure_app_user(
             config.mongo_root_uri,
             config.mongo_app_username,
@@ -45,24 +75,33 @@ async def start_bot():
             config.mongo_root_auth_db,
         )
 
-    mongo = Mongo(config.mongo_uri, config.mongo_db_name)
+    mongo = Mongo(
+        config.mongo_uri,
+        config.mongo_db_name,
+        max_pool_size=config.mongo_max_pool_size,
+        min_pool_size=config.mongo_min_pool_size,
+        max_idle_time_ms=config.mongo_max_idle_time_ms,
+        compressors=config.mongo_compressors,
+    )
     aggregation = AggregationService(
         mongo.db(),
         users_collection=config.mongo_users_collection,
         servers_collection=config.mongo_servers_collection,
         meta_collection=config.mongo_meta_collection,
+        active_users_collection=config.mongo_active_users_collection,
     )
-    await aggregation.ensure_indexes()
     renderer = StatsRenderer(bot)
 
     # Attach dependencies to bot for cogs to consume
-    bot.config = config  # type: ignore[attr-defined]
     bot.mongo = mongo  # type: ignore[attr-defined]
     bot.aggregation = aggregation  # type: ignore[attr-defined]
     bot.renderer = renderer  # type: ignore[attr-defined]
 
-    await bot.load_extension("bot.cogs.stats_collector")
-    await bot.load_extension("bot.cogs.stats_commands")
+    # Index checks and extension loading are independent, so run them together
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(aggregation.ensure_indexes())
+        tg.create_task(bot.load_extension("bot.cogs.stats_collector"))
+        tg.create_task(bot.load_extension("bot.cogs.stats_commands"))
 
     loop = asyncio.get_running_loop()
 
@@ -85,7 +124,13 @@ async def start_bot():
 
 
 def main():
-    asyncio.run(start_bot())
+    # uvloop is optional (not available on Windows); fall back to the stock event loop
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(start_bot())
+    else:
+        uvloop.run(start_bot())
 
 
 if __name__ == "__main__":
@@ -1,58 +1,286 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from datetime import date, datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import IndexModel, UpdateOne
 
-from bot.db.models import DATE_FORMAT, date_key, user_key
+from bot.db.models import active_user_key, date_key, epoch_date_key, relevant_dates, user_key, utc_day_and_now
 
 logger = logging.getLogger(__name__)
 
+# Read-side cache lifetimes in seconds. Writes don't invalidate entries: the collector flushes
+# several times a second and would defeat the cache, so reads are served up to the TTL stale
+WINDOW_CACHE_TTL = 30.0
+TOP_USERS_CACHE_TTL = 30.0
+# Days of daily_stats kept on each document; the longest read window is 30 days
+DAILY_STATS_RETENTION_DAYS = 31
+# meta document recording that legacy per-day active_users arrays were moved into markers
+ACTIVE_USERS_MIGRATION_ID = "migration:active_user_markers"
+
+
+def _epoch(ts: datetime) -> float:
+    # Naive datetimes are UTC throughout the bot
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
 
 class AggregationService:
+    __slots__ = (
+        "db",
+        "users",
+        "servers",
+        "meta",
+        "active_users",
+        "_pending_guilds",
+        "_pending_users",
+        "_pending_ts",
+        "_flush_lock",
+        "_read_cache",
+        "_stats_message_ids",
+    )
+
     def __init__(
         self,
         db: AsyncIOMotorDatabase,
         users_collection: str = "users",
         servers_collection: str = "servers",
         meta_collection: str = "meta",
+        active_users_collection: str = "active_users",
     ):
         self.db = db
         self.users: AsyncIOMotorCollection = db[users_collection]
         self.servers: AsyncIOMotorCollection = db[servers_collection]
         self.meta: AsyncIOMotorCollection = db[meta_collection]
+        self.active_users: AsyncIOMotorCollection = db[active_users_collection]
+        # Messages waiting for the next flush_messages call, stored as parallel typed arrays
+        self._pending_guilds = array("q")
+        self._pending_users = array("q")
+        self._pending_ts = array("d")
+        self._flush_lock = asyncio.Lock()
+        # (kind, guild_id, today, *args) -> (expires_at, value)
+        self._read_cache: Dict[tuple, Tuple[float, object]] = {}
+        # Stats message ids only change through the setters below, so this cache never goes stale
+        self._stats_message_ids: Dict[int, Optional[int]] = {}
 
     async def ensure_indexes(self) -> None:
-        await self._ensure_index(self.users, [("guild_id", 1)], name="users_guild_id_idx")
-        await self._ensure_index(self.users, [("user_id", 1)], name="users_user_id_idx")
-        await self._ensure_index(self.servers, [("guild_id", 1)], name="servers_guild_id_unique", unique=True)
-        await self._ensure_index(self.meta, [("guild_id", 1)], name="meta_guild_id_idx")
+        await asyncio.gather(
+            # Every users query filters on guild_id; indexing a counter would be rewritten on every flush
+            self._ensure_indexes(
+                self.users,
+                [IndexModel([("guild_id", 1)], name="users_guild_id_idx")],
+                obsolete=("users_user_id_idx", "users_guild_total_idx"),
+            ),
+            self._ensure_indexes(
+                self.servers, [IndexModel([("guild_id", 1)], name="servers_guild_id_unique", unique=True)]
+            ),
+            self._ensure_indexes(self.meta, [IndexModel([("guild_id", 1)], name="meta_guild_id_idx")]),
+            self._ensure_indexes(
+                self.active_users,
+                [
+                    IndexModel([("guild_id", 1), ("day", 1), ("user_id", 1)], name="active_users_guild_day_idx"),
+                    # Markers only need to outlive the longest read window
+                    IndexModel(
+                        [("created_at", 1)],
+                        name="active_users_ttl_idx",
+                        expireAfterSeconds=(DAILY_STATS_RETENTION_DAYS + 1) * 86400,
+                    ),
+                ],
+            ),
+        )
+        await self._migrate_legacy_active_users()
 
-    async def _ensure_index(self, collection: AsyncIOMotorCollection, keys, name: str, **kwargs) -> None:
+    async def _migrate_legacy_active_users(self) -> None:
+        """Move per-day active_users arrays from server documents into marker documents, once."""
+        if await self.meta.find_one({"_id": ACTIVE_USERS_MIGRATION_ID}, {"_id": 1}):
+            return
+        cutoff_str = self._cutoff_key(datetime.utcnow(), DAILY_STATS_RETENTION_DAYS)
+        # Expand every in-retention day's array into markers; markers written since deploy win
+        await self.servers.aggregate(
+            [
+                {"$match": {"daily_stats": {"$exists": True}}},
+                {"$project": {"_id": 0, "guild_id": 1, "day": {"$objectToArray": "$daily_stats"}}},
+                {"$unwind": "$day"},
+                # Same shape check as _is_day_key, so malformed keys are skipped rather than fatal
+                {
+                    "$match": {
+                        "day.k": {"$gte": cutoff_str, "$regex": r"^\d{4}-\d{2}-\d{2}$"},
+                        "day.v.active_users": {"$type": "array"},
+                    }
+                },
+                {"$unwind": "$day.v.active_users"},
+                {
+                    "$project": {
+                        "_id": {
+                            "$concat": [
+                                {"$toString": "$guild_id"},
+                                ":",
+                                "$day.k",
+                                ":",
+                                {"$toString": "$day.v.active_users"},
+                            ]
+                        },
+                        "guild_id": 1,
+                        "day": "$day.k",
+                        "user_id": "$day.v.active_users",
+                        # Expire with the day the marker belongs to, not the migration time
+                        "created_at": {
+                            "$dateFromString": {"dateString": "$day.k", "format": "%Y-%m-%d", "onError": "$$NOW"}
+                        },
+                    }
+                },
+                {
+                    "$merge": {
+                        "into": self.active_users.name,
+                        "on": "_id",
+                        "whenMatched": "keepExisting",
+                        "whenNotMatched": "insert",
+                    }
+                },
+            ]
+        ).to_list(None)
+        # Strip the legacy fields so day reads stop carrying the arrays
+        legacy_fields = ["active_users", "active_user_count"]
+        result = await self.servers.update_many(
+            {"daily_stats": {"$exists": True}},
+            [
+                {
+                    "$set": {
+                        "daily_stats": {
+                            "$arrayToObject": {
+                                "$map": {
+                                    "input": {"$objectToArray": "$daily_stats"},
+                                    "as": "day",
+                                    "in": {
+                                        "k": "$$day.k",
+                                        "v": {
+                                            "$arrayToObject": {
+                                                "$filter": {
+                                                    "input": {"$objectToArray": "$$day.v"},
+                                                    "as": "metric",
+                                                    "cond": {"$not": [{"$in": ["$$metric.k", legacy_fields]}]},
+                                                }
+                                            }
+                                        },
+                                    },
+                                }
+                            }
+                        }
+                    }
+                }
+            ],
+        )
+        now = datetime.utcnow()
+        await self.meta.update_one(
+            {"_id": ACTIVE_USERS_MIGRATION_ID},
+            {"$set": {"data": {"cutoff": cutoff_str}, "updated_at": now}, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        )
+        logger.info("Migrated legacy active users into markers on %d server documents", result.modified_count)
+
+    async def _ensure_indexes(
+        self, collection: AsyncIOMotorCollection, models: List[IndexModel], obsolete: Sequence[str] = ()
+    ) -> None:
+        # One listIndexes round-trip, then a single createIndexes for whatever is missing
         existing = await collection.index_information()
-        for existing_name, info in existing.items():
-            if info.get("key") == keys:
-                # If uniqueness expectations differ, log and keep existing index
-                expected_unique = kwargs.get("unique", False)
-                if expected_unique and not info.get("unique", False):
-                    logger.warning(
-                        "Index %s on %s already exists but is not unique as expected",
-                        existing_name,
-                        collection.name,
-                    )
-                return
-        await collection.create_index(keys, name=name, **kwargs)
+        for name in obsolete:
+            # Unused indexes still cost a write on every update, so drop them once they are superseded
+            if existing.pop(name, None) is not None:
+                logger.info("Dropping unused index %s on %s", name, collection.name)
+                await collection.drop_index(name)
+        existing_by_key = {tuple(info.get("key", [])): (name, info) for name, info in existing.items()}
+        missing: List[IndexModel] = []
+        for model in models:
+            spec = model.document
+            match = existing_by_key.get(tuple(spec["key"].items()))
+            if match is None:
+                missing.append(model)
+                continue
+            # If uniqueness expectations differ, log and keep existing index
+            existing_name, info = match
+            if spec.get("unique", False) and not info.get("unique", False):
+                logger.warning(
+                    "Index %s on %s already exists but is not unique as expected",
+                    existing_name,
+                    collection.name,
+                )
+        if missing:
+            await collection.create_indexes(missing)
 
     # Write operations
     async def record_message(self, guild_id: int, user_id: int, ts: Optional[datetime] = None) -> None:
-        ts = ts or datetime.utcnow()
-        day = date_key(ts)
+        self.record_message_sync(guild_id, user_id, ts)
+        await self.flush_messages()
+
+    def record_message_sync(self, guild_id: int, user_id: int, ts: Optional[datetime] = None) -> None:
+        """Queue a message to be persisted by the next flush_messages call."""
+        self._pending_guilds.append(guild_id)
+        self._pending_users.append(user_id)
+        self._pending_ts.append(_epoch(ts) if ts else time.time())
+
+    async def flush_messages(self) -> None:
+        """Swap out the queued messages and persist them in one batch."""
+        async with self._flush_lock:
+            if not self._pending_guilds:
+                return
+            guild_ids, user_ids, timestamps = self._pending_guilds, self._pending_users, self._pending_ts
+            self._pending_guilds, self._pending_users, self._pending_ts = array("q"), array("q"), array("d")
+            await self.record_messages_bulk(guild_ids, user_ids, timestamps)
+
+    @property
+    def pending_message_count(self) -> int:
+        return len(self._pending_guilds)
+
+    async def record_messages_bulk(
+        self, guild_ids: Sequence[int], user_ids: Sequence[int], timestamps: Sequence[float]
+    ) -> None:
+        """Persist parallel sequences of messages with one bulk round-trip per collection."""
+        if not guild_ids:
+            return
+        # Coalesce per document so K messages from one user or guild become a single update
+        user_incs: Dict[Tuple[int, int], Dict[str, int]] = {}
+        server_days: Dict[int, Dict[str, int]] = {}
+        active: Set[Tuple[int, str, int]] = set()
+        for guild_id, user_id, ts in zip(guild_ids, user_ids, timestamps):
+            day = epoch_date_key(ts)
+            incs = user_incs.setdefault((guild_id, user_id), {"total_messages": 0})
+            incs["total_messages"] += 1
+            daily_field = f"daily_stats.{day}.messages"
+            incs[daily_field] = incs.get(daily_field, 0) + 1
+            days = server_days.setdefault(guild_id, {})
+            days[day] = days.get(day, 0) + 1
+            active.add((guild_id, day, user_id))
+
         now = datetime.utcnow()
-        user_filter = {"_id": user_key(guild_id, user_id)}
-        user_update = {
-            "$inc": {"total_messages": 1, f"daily_stats.{day}.messages": 1},
+        # Each write also drops the day that just left retention, keeping active documents bounded
+        # between the nightly prunes at no extra round-trip
+        expired_day = self._cutoff_key(now, DAILY_STATS_RETENTION_DAYS + 1)
+        user_ops = [
+            self._user_message_update(guild_id, user_id, incs, now, expired_day)
+            for (guild_id, user_id), incs in user_incs.items()
+        ]
+        server_ops = [
+            self._server_message_update(guild_id, days, now, expired_day) for guild_id, days in server_days.items()
+        ]
+        active_ops = [self._active_user_marker(guild_id, day, user_id, now) for guild_id, day, user_id in active]
+        # The collections are independent, so the three batches share one round-trip of latency
+        await asyncio.gather(
+            self.users.bulk_write(user_ops, ordered=False),
+            self.servers.bulk_write(server_ops, ordered=False),
+            self.active_users.bulk_write(active_ops, ordered=False),
+        )
+
+    def _user_message_update(
+        self, guild_id: int, user_id: int, incs: Dict[str, int], now: datetime, expired_day: str
+    ) -> UpdateOne:
+        update_doc = {
+            "$inc": incs,
             "$set": {"guild_id": guild_id, "user_id": user_id, "updated_at": now},
             "$setOnInsert": {
                 "reactions_given": 0,
@@ -60,16 +288,30 @@ class AggregationService:
                 "created_at": now,
             },
         }
-        await self.users.update_one(user_filter, user_update, upsert=True)
-
-        server_filter = {"_id": str(guild_id)}
-        server_update = {
-            "$inc": {f"daily_stats.{day}.messages": 1},
-            "$addToSet": {f"daily_stats.{day}.active_users": user_id},
+        # A late message for the expired day itself would conflict with the $unset path
+        if f"daily_stats.{expired_day}.messages" not in incs:
+            update_doc["$unset"] = {f"daily_stats.{expired_day}": ""}
+        return UpdateOne({"_id": user_key(guild_id, user_id)}, update_doc, upsert=True)
+
+    def _server_message_update(
+        self, guild_id: int, days: Dict[str, int], now: datetime, expired_day: str
+    ) -> UpdateOne:
+        update_doc = {
+            "$inc": {f"daily_stats.{day}.messages": messages for day, messages in days.items()},
             "$set": {"guild_id": guild_id, "updated_at": now},
             "$setOnInsert": {"created_at": now, "stats_channel_id": None, "stats_message_id": None},
         }
-        await self.servers.update_one(server_filter, server_update, upsert=True)
+        if expired_day not in days:
+            update_doc["$unset"] = {f"daily_stats.{expired_day}": ""}
+        return UpdateOne({"_id": str(guild_id)}, update_doc, upsert=True)
+
+    def _active_user_marker(self, guild_id: int, day: str, user_id: int, now: datetime) -> UpdateOne:
+        # Insert-only upsert: a user already active that day is a no-op on an _id lookup
+        return UpdateOne(
+            {"_id": active_user_key(guild_id, day, user_id)},
+            {"$setOnInsert": {"guild_id": guild_id, "day": day, "user_id": user_id, "created_at": now}},
+            upsert=True,
+        )
 
     async def record_reaction_add(
         self, guild_id: int, reactor_id: int, message_author_id: Optional[int], ts: Optional[datetime] = None
@@ -84,33 +326,34 @@ class AggregationService:
     async def _record_reaction_change(
         self, guild_id: int, reactor_id: int, message_author_id: Optional[int], delta: int, ts: Optional[datetime]
     ) -> None:
-        ts = ts or datetime.utcnow()
-        day = date_key(ts)
-        now = datetime.utcnow()
-
-        # Update reactions given
-        await self._update_user_counter(
-            guild_id,
-            reactor_id,
-            total_field="reactions_given",
-            daily_field=f"daily_stats.{day}.reactions_given",
-            delta=delta,
-            timestamp=now,
-        )
+        day, now = utc_day_and_now()
+        if ts is not None:
+            day = date_key(ts)
 
-        # Update reactions received
-        if message_author_id is not None:
-            await self._update_user_counter(
+        # Each counter lives in its own document, so the updates are issued concurrently
+        updates = [
+            self._update_user_counter(
                 guild_id,
-                message_author_id,
-                total_field="reactions_received",
-                daily_field=f"daily_stats.{day}.reactions_received",
+                reactor_id,
+                total_field="reactions_given",
+                daily_field=f"daily_stats.{day}.reactions_given",
                 delta=delta,
                 timestamp=now,
+            ),
+            self._update_server_reactions(guild_id, day, delta, now),
+        ]
+        if message_author_id is not None:
+            updates.append(
+                self._update_user_counter(
+                    guild_id,
+                    message_author_id,
+                    total_field="reactions_received",
+                    daily_field=f"daily_stats.{day}.reactions_received",
+                    delta=delta,
+                    timestamp=now,
+                )
             )
-
-        # Update server reactions
-        await self._update_server_reactions(guild_id, day, delta, now)
+        await asyncio.gather(*updates)
 
     async def _update_user_counter(
         self,
@@ -122,103 +365,183 @@ class AggregationService:
         timestamp: datetime,
     ) -> None:
         filter_doc = {"_id": user_key(guild_id, user_id)}
-        day_key, daily_field_name = self._parse_daily_field(daily_field)
-        projection = {total_field: 1, "daily_stats": 1}
-        existing = await self.users.find_one(filter_doc, projection)
-        daily_value = 0
-        if day_key and daily_field_name and existing:
-            daily_value = existing.get("daily_stats", {}).get(day_key, {}).get(daily_field_name, 0)
-
-        update_doc = {
-            "$inc": {total_field: delta, daily_field: delta},
-            "$set": {"guild_id": guild_id, "user_id": user_id, "updated_at": timestamp},
-            "$setOnInsert": {
-                "created_at": timestamp,
-            },
-        }
-
         if delta > 0:
+            update_doc = {
+                "$inc": {total_field: delta, daily_field: delta},
+                "$set": {"guild_id": guild_id, "user_id": user_id, "updated_at": timestamp},
+                "$setOnInsert": {
+                    "created_at": timestamp,
+                },
+            }
             await self.users.update_one(filter_doc, update_doc, upsert=True)
             return
 
-        if not existing:
-            return
-        current_total = existing.get(total_field, 0)
-        if current_total <= 0 and daily_value <= 0:
-            return
-        safe_total_delta = delta if current_total + delta >= 0 else -current_total
-        safe_daily_delta = delta if daily_value + delta >= 0 else -daily_value
-        if safe_total_delta == 0 and safe_daily_delta == 0:
-            return
-        update_doc["$inc"] = {total_field: safe_total_delta, daily_field: safe_daily_delta}
-        await self.users.update_one(filter_doc, update_doc, upsert=False)
+        # Clamp at zero server-side so a decrement is one round-trip with no read-then-write race
+        filter_doc["$or"] = [{total_field: {"$gt": 0}}, {daily_field: {"$gt": 0}}]
+        update_pipeline = [
+            {
+                "$set": {
+                    total_field: self._clamped_add(total_field, delta),
+                    daily_field: self._clamped_add(daily_field, delta),
+                    "updated_at": timestamp,
+                }
+            }
+        ]
+        await self.users.update_one(filter_doc, update_pipeline, upsert=False)
 
     async def _update_server_reactions(self, guild_id: int, day: str, delta: int, timestamp: datetime) -> None:
         filter_doc = {"_id": str(guild_id)}
-        update_doc = {
-            "$inc": {f"daily_stats.{day}.reactions": delta},
-            "$set": {"guild_id": guild_id, "updated_at": timestamp},
-            "$setOnInsert": {"created_at": timestamp, "stats_channel_id": None, "stats_message_id": None},
-        }
-
+        reactions_field = f"daily_stats.{day}.reactions"
         if delta > 0:
+            update_doc = {
+                "$inc": {reactions_field: delta},
+                "$set": {"guild_id": guild_id, "updated_at": timestamp},
+                "$setOnInsert": {"created_at": timestamp, "stats_channel_id": None, "stats_message_id": None},
+            }
             await self.servers.update_one(filter_doc, update_doc, upsert=True)
             return
 
-        existing = await self.servers.find_one(filter_doc, {"daily_stats": 1})
-        if not existing:
-            return
-        current = existing.get("daily_stats", {}).get(day, {}).get("reactions", 0)
-        if current <= 0:
-            return
-        safe_delta = delta if current + delta >= 0 else -current
-        if safe_delta == 0:
-            return
-        update_doc["$inc"] = {f"daily_stats.{day}.reactions": safe_delta}
-        await self.servers.update_one(filter_doc, update_doc, upsert=False)
+        filter_doc[reactions_field] = {"$gt": 0}
+        update_pipeline = [
+            {"$set": {reactions_field: self._clamped_add(reactions_field, delta), "updated_at": timestamp}}
+        ]
+        await self.servers.update_one(filter_doc, update_pipeline, upsert=False)
+
+    @staticmethod
+    def _clamped_add(field_path: str, delta: int) -> dict:
+        return {"$max": [0, {"$add": [{"$ifNull": [f"${field_path}", 0]}, delta]}]}
+
+    async def prune_daily_stats(self, now: Optional[datetime] = None) -> None:
+        """Drop daily_stats days older than the retention window from every document."""
+        now = now or datetime.utcnow()
+        cutoff_str = self._cutoff_key(now, DAILY_STATS_RETENTION_DAYS)
+        prune_pipeline = [
+            {
+                "$set": {
+                    "daily_stats": {
+                        "$arrayToObject": {
+                            "$filter": {
+                                "input": {"$objectToArray": {"$ifNull": ["$daily_stats", {}]}},
+                                "as": "day",
+                                "cond": {"$gte": ["$$day.k", cutoff_str]},
+                            }
+                        }
+                    }
+                }
+            }
+        ]
+        users_result, servers_result = await asyncio.gather(
+            self.users.update_many({"daily_stats": {"$exists": True}}, prune_pipeline),
+            self.servers.update_many({"daily_stats": {"$exists": True}}, prune_pipeline),
+        )
+        logger.info(
+            "Pruned daily_stats before %s on %d user and %d server documents",
+            cutoff_str,
+            users_result.modified_count,
+            servers_result.modified_count,
+        )
 
     # Read operations
     async def get_server_windows(self, guild_id: int, days: int, now: Optional[datetime] = None) -> Dict[str, int]:
-        now = now or datetime.utcnow()
-        window_days = max(days, 1)
-        cutoff_date = (now - timedelta(days=window_days - 1)).date()
-        server_doc = await self.servers.find_one({"_id": str(guild_id)})
-        messages = 0
-        reactions = 0
-        active_users: Set[int] = set()
+        windows = await self.get_server_windows_multi(guild_id, [days], now)
+        return windows[days]
+
+    async def get_server_windows_multi(
+        self, guild_id: int, days_list: Sequence[int], now: Optional[datetime] = None
+    ) -> Dict[int, Dict[str, int]]:
+        """Return server windows for several lengths, reading the server document at most once."""
+        if now is not None:
+            return await self._compute_server_windows(guild_id, days_list, now)
+        keys = {days: self._cache_key("windows", guild_id, days) for days in days_list}
+        windows = {days: self._cache_get(key) for days, key in keys.items()}
+        missing = [days for days, value in windows.items() if value is None]
+        if missing:
+            computed = await self._compute_server_windows(guild_id, missing, datetime.utcnow())
+            for days in missing:
+                self._cache_put(keys[days], computed[days], WINDOW_CACHE_TTL)
+                windows[days] = computed[days]
+        return windows
+
+    async def _compute_server_windows(
+        self, guild_id: int, days_list: Sequence[int], now: datetime
+    ) -> Dict[int, Dict[str, int]]:
+        cutoffs = {days: self._cutoff_key(now, days) for days in days_list}
+        projection = self._daily_projection(max(days_list, default=1), now, ("messages", "reactions"))
+        server_doc, active_counts = await asyncio.gather(
+            self.servers.find_one({"_id": str(guild_id)}, projection),
+            self._count_active_users(guild_id, cutoffs),
+        )
+        window_stats: Dict[int, List[Dict]] = {days: [] for days in days_list}
         if server_doc and "daily_stats" in server_doc:
+            # Validate each day key once and sort it into every window it falls in
             for day_key, day_stats in server_doc["daily_stats"].items():
-                if not self._day_within_window(day_key, cutoff_date):
+                if not self._is_day_key(day_key):
                     continue
-                messages += day_stats.get("messages", 0)
-                reactions += day_stats.get("reactions", 0)
-                active_users.update(day_stats.get("active_users", []))
-        return {"messages": messages, "reactions": reactions, "active_users": len(active_users)}
+                for days, cutoff_key in cutoffs.items():
+                    if day_key >= cutoff_key:
+                        window_stats[days].append(day_stats)
+        return {
+            days: {
+                "messages": sum(day_stats.get("messages", 0) for day_stats in stats),
+                "reactions": sum(day_stats.get("reactions", 0) for day_stats in stats),
+                "active_users": active_counts[days],
+            }
+            for days, stats in window_stats.items()
+        }
+
+    async def _count_active_users(self, guild_id: int, cutoffs: Dict[int, str]) -> Dict[int, int]:
+        # Bucket users by the last day they were active; every window is then a sum over buckets
+        counts = {days: 0 for days in cutoffs}
+        if not cutoffs:
+            return counts
+        pipeline = [
+            {"$match": {"guild_id": guild_id, "day": {"$gte": min(cutoffs.values())}}},
+            {"$group": {"_id": "$user_id", "last_day": {"$max": "$day"}}},
+            {"$group": {"_id": "$last_day", "users": {"$sum": 1}}},
+        ]
+        async for bucket in self.active_users.aggregate(pipeline):
+            for days, cutoff_key in cutoffs.items():
+                if bucket["_id"] >= cutoff_key:
+                    counts[days] += bucket["users"]
+        return counts
 
     async def get_top_users_by_messages(
         self, guild_id: int, days: int, limit: int = 5, now: Optional[datetime] = None
     ) -> List[Tuple[int, int]]:
-        now = now or datetime.utcnow()
-        window_days = max(days, 1)
-        cutoff_date = (now - timedelta(days=window_days - 1)).date()
-        cursor = self.users.find({"guild_id": guild_id})
-        top: List[Tuple[int, int]] = []
-        async for doc in cursor:
-            daily_stats = doc.get("daily_stats", {})
-            total = 0
-            for day_key, value in daily_stats.items():
-                if not self._day_within_window(day_key, cutoff_date):
-                    continue
-                total += value.get("messages", 0)
-            user_id = doc.get("user_id")
-            if total > 0 and user_id is not None:
-                top.append((user_id, total))
-        top.sort(key=lambda item: item[1], reverse=True)
-        return top[:limit]
+        if now is not None:
+            return await self._compute_top_users_by_messages(guild_id, days, limit, now)
+        key = self._cache_key("top_users", guild_id, days, limit)
+        cached = self._cache_get(key)
+        if cached is None:
+            cached = await self._compute_top_users_by_messages(guild_id, days, limit, datetime.utcnow())
+            self._cache_put(key, cached, TOP_USERS_CACHE_TTL)
+        return cached
+
+    async def _compute_top_users_by_messages(
+        self, guild_id: int, days: int, limit: int, now: datetime
+    ) -> List[Tuple[int, int]]:
+        # Sum only the window's day keys instead of expanding and filtering all of daily_stats
+        day_totals = [{"$ifNull": [f"$daily_stats.{day}.messages", 0]} for day in relevant_dates(max(days, 1), now)]
+        pipeline = [
+            {"$match": {"guild_id": guild_id, "user_id": {"$ne": None}}},
+            {"$project": {"_id": 0, "user_id": 1, "total": {"$add": day_totals}}},
+            {"$match": {"total": {"$gt": 0}}},
+            {"$sort": {"total": -1, "user_id": 1}},
+            {"$limit": limit},
+        ]
+        return [(doc["user_id"], doc["total"]) async for doc in self.users.aggregate(pipeline)]
 
     async def get_user_summary(self, guild_id: int, user_id: int, now: Optional[datetime] = None) -> Dict[str, int]:
         now = now or datetime.utcnow()
-        doc = await self.users.find_one({"_id": user_key(guild_id, user_id)})
+        projection = self._daily_projection(
+            30,
+            now,
+            ("messages", "reactions_given", "reactions_received"),
+            "total_messages",
+            "reactions_given",
+            "reactions_received",
+        )
+        doc = await self.users.find_one({"_id": user_key(guild_id, user_id)}, projection)
         if not doc:
             return {
                 "total_messages": 0,
@@ -228,9 +551,7 @@ class AggregationService:
                 "messages_30d": 0,
                 "reactions_given_7d": 0,
             }
-        daily_stats = doc.get("daily_stats", {})
-        stats_7d = self._sum_daily(daily_stats, 7, now)
-        stats_30d = self._sum_daily(daily_stats, 30, now)
+        stats_7d, stats_30d = self._sum_daily_windows(doc.get("daily_stats", {}), (7, 30), now)
         return {
             "total_messages": doc.get("total_messages", 0),
             "reactions_given": doc.get("reactions_given", 0),
@@ -240,37 +561,72 @@ class AggregationService:
             "reactions_given_7d": stats_7d.get("reactions_given", 0),
         }
 
-    def _sum_daily(self, daily_stats: Dict[str, Dict], days: int, now: datetime) -> Dict[str, int]:
-        totals = {"messages": 0, "reactions_given": 0, "reactions_received": 0}
-        window_days = max(days, 1)
-        cutoff_date = (now - timedelta(days=window_days - 1)).date()
+    @staticmethod
+    def _daily_projection(days: int, now: datetime, metrics: Sequence[str], *fields: str) -> Dict[str, int]:
+        # Ship only the summed metrics of the days a window can include, not the whole daily_stats map
+        projection = dict.fromkeys(fields, 1)
+        projection.update(
+            (f"daily_stats.{day}.{metric}", 1) for day in relevant_dates(days, now) for metric in metrics
+        )
+        return projection
+
+    def _sum_daily_windows(
+        self, daily_stats: Dict[str, Dict], days_list: Sequence[int], now: datetime
+    ) -> List[Dict[str, int]]:
+        # One pass over the stored days feeds every requested window
+        cutoffs = [self._cutoff_key(now, days) for days in days_list]
+        totals = [{"messages": 0, "reactions_given": 0, "reactions_received": 0} for _ in days_list]
         for day_key, values in daily_stats.items():
-            if not self._day_within_window(day_key, cutoff_date):
+            if not self._is_day_key(day_key):
                 continue
-            totals["messages"] += values.get("messages", 0)
-            totals["reactions_given"] += values.get("reactions_given", 0)
-            totals["reactions_received"] += values.get("reactions_received", 0)
+            for cutoff_key, window_totals in zip(cutoffs, totals):
+                if day_key < cutoff_key:
+                    continue
+                window_totals["messages"] += values.get("messages", 0)
+                window_totals["reactions_given"] += values.get("reactions_given", 0)
+                window_totals["reactions_received"] += values.get("reactions_received", 0)
         return totals
 
-    def _parse_daily_field(self, daily_field: str) -> Tuple[Optional[str], Optional[str]]:
-        parts = daily_field.split(".")
-        if len(parts) >= 3:
-            return parts[1], parts[2]
-        return None, None
-
-    def _day_within_window(self, day_key: str, cutoff_date: date) -> bool:
-        try:
-            day_date = datetime.strptime(day_key, DATE_FORMAT).date()
-        except ValueError:
-            logger.warning("Skipping malformed day key %s", day_key)
-            return False
-        return day_date >= cutoff_date
+    def _cache_key(self, kind: str, guild_id: int, *args: int) -> tuple:
+        # Keyed by today's date key so windows never straddle midnight
+        return (kind, guild_id, date_key(), *args)
+
+    def _cache_get(self, key: tuple):
+        entry = self._read_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._read_cache[key]
+            return None
+        return value
+
+    def _cache_put(self, key: tuple, value: object, ttl: float) -> None:
+        now = time.monotonic()
+        # Yesterday's keys are never read again, so expiry is what keeps the cache bounded
+        for stale in [k for k, (expires_at, _) in self._read_cache.items() if expires_at <= now]:
+            del self._read_cache[stale]
+        self._read_cache[key] = (now + ttl, value)
+
+    @staticmethod
+    def _cutoff_key(now: datetime, days: int) -> str:
+        # YYYY-MM-DD keys order lexicographically, so windows compare strings instead of parsing dates
+        return date_key(now - timedelta(days=max(days, 1) - 1))
+
+    @staticmethod
+    def _is_day_key(day_key: str) -> bool:
+        if len(day_key) == 10 and day_key[4] == "-" and day_key[7] == "-":
+            return True
+        logger.warning("Skipping malformed day key %s", day_key)
+        return False
 
     async def get_stats_message_id(self, guild_id: int) -> Optional[int]:
+        if guild_id in self._stats_message_ids:
+            return self._stats_message_ids[guild_id]
         meta = await self.servers.find_one({"_id": str(guild_id)}, {"stats_message_id": 1})
-        if meta:
-            return meta.get("stats_message_id")
-        return None
+        message_id = meta.get("stats_message_id") if meta else None
+        self._stats_message_ids[guild_id] = message_id
+        return message_id
 
     async def set_stats_message_id(self, guild_id: int, message_id: int) -> None:
         now = datetime.utcnow()
@@ -286,6 +642,25 @@ class AggregationService:
             },
             upsert=True,
         )
+        self._stats_message_ids[guild_id] = message_id
+
+    async def set_stats_message(self, guild_id: int, channel_id: int, message_id: int) -> None:
+        """Persist the stats channel and message ids with a single update."""
+        now = datetime.utcnow()
+        await self.servers.update_one(
+            {"_id": str(guild_id)},
+            {
+                "$set": {
+                    "guild_id": guild_id,
+                    "stats_channel_id": channel_id,
+                    "stats_message_id": message_id,
+                    "updated_at": now,
+                },
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
+        self._stats_message_ids[guild_id] = message_id
 
     async def set_stats_channel_id(self, guild_id: int, channel_id: int) -> None:
         now = datetime.utcnow()
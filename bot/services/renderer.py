@@ -1,17 +1,40 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import discord
 
 logger = logging.getLogger(__name__)
 
+# Display names resolved over HTTP are reused across renders for this long
+MEMBER_NAME_TTL = 3600.0
+MEMBER_NAME_CACHE_SIZE = 10_000
+
+SERVER_COLOUR = discord.Colour.blurple()
+USER_COLOUR = discord.Colour.green()
+
+# (field name, stats key) pairs rendered by user_embed, in display order
+_USER_FIELDS = (
+    ("Total Messages", "total_messages"),
+    ("Messages (7d)", "messages_7d"),
+    ("Messages (30d)", "messages_30d"),
+    ("Reactions Given", "reactions_given"),
+    ("Reactions Given (7d)", "reactions_given_7d"),
+    ("Reactions Received", "reactions_received"),
+)
+
 
 class StatsRenderer:
+    __slots__ = ("bot", "_member_names")
+
     def __init__(self, bot: discord.Client):
         self.bot = bot
+        # (guild_id, user_id) -> (expires_at, display_name) for members missing from the gateway cache
+        self._member_names: Dict[Tuple[int, int], Tuple[float, str]] = {}
 
     async def server_embed(
         self,
@@ -24,8 +47,11 @@ class StatsRenderer:
         top_users_30d: List[Tuple[int, int]],
         last_updated: datetime,
     ) -> discord.Embed:
-        embed = discord.Embed(title=f"{guild.name} • Activity", colour=discord.Colour.blurple())
-        embed.set_thumbnail(url=guild.icon.url if guild.icon else discord.Embed.Empty)
+        embed = discord.Embed(title=f"{guild.name} • Activity", colour=SERVER_COLOUR)
+        # Guild.icon builds a new Asset on every access, so read it once
+        icon = guild.icon
+        if icon is not None:
+            embed.set_thumbnail(url=icon.url)
 
         embed.add_field(
             name="Messages (24h)",
@@ -45,35 +71,62 @@ class StatsRenderer:
         embed.add_field(name="Reactions (7d)", value=f"{reactions_7d:,}", inline=True)
         embed.add_field(name="Reactions (30d)", value=f"{reactions_30d:,}", inline=True)
 
-        embed.add_field(
-            name="Top Users (24h)", value=await self._format_top_users(guild, top_users_24h), inline=False
-        )
-        embed.add_field(name="Top Users (7d)", value=await self._format_top_users(guild, top_users_7d), inline=False)
-        embed.add_field(name="Top Users (30d)", value=await self._format_top_users(guild, top_users_30d), inline=False)
+        # Resolve every listed user in one batch; the three rankings mostly overlap
+        user_ids = {user_id for entries in (top_users_24h, top_users_7d, top_users_30d) for user_id, _ in entries}
+        names = await self._resolve_names(guild, user_ids)
+        embed.add_field(name="Top Users (24h)", value=self._format_top_users(top_users_24h, names), inline=False)
+        embed.add_field(name="Top Users (7d)", value=self._format_top_users(top_users_7d, names), inline=False)
+        embed.add_field(name="Top Users (30d)", value=self._format_top_users(top_users_30d, names), inline=False)
         formatted_ts = last_updated.strftime("%Y-%m-%d %H:%M")
         embed.set_footer(text=f"Last update: {formatted_ts} (Kyiv)")
         return embed
 
     async def user_embed(self, member: discord.Member, stats: Dict[str, int]) -> discord.Embed:
-        embed = discord.Embed(title=f"{member.display_name} • Your Stats", colour=discord.Colour.green())
+        embed = discord.Embed(title=f"{member.display_name} • Your Stats", colour=USER_COLOUR)
         embed.set_thumbnail(url=member.display_avatar.url)
-        embed.add_field(name="Total Messages", value=f"{stats.get('total_messages', 0):,}")
-        embed.add_field(name="Messages (7d)", value=f"{stats.get('messages_7d', 0):,}")
-        embed.add_field(name="Messages (30d)", value=f"{stats.get('messages_30d', 0):,}")
-        embed.add_field(name="Reactions Given", value=f"{stats.get('reactions_given', 0):,}")
-        embed.add_field(name="Reactions Given (7d)", value=f"{stats.get('reactions_given_7d', 0):,}")
-        embed.add_field(name="Reactions Received", value=f"{stats.get('reactions_received', 0):,}")
+        for name, key in _USER_FIELDS:
+            embed.add_field(name=name, value=format(stats.get(key, 0), ","))
         return embed
 
-    async def _format_top_users(self, guild: discord.Guild, entries: List[Tuple[int, int]]) -> str:
+    def _format_top_users(self, entries: List[Tuple[int, int]], names: Dict[int, str]) -> str:
         if not entries:
             return "No data yet."
-        lines = []
-        for idx, (user_id, count) in enumerate(entries, start=1):
-            member = guild.get_member(user_id) or await self._safe_fetch_member(guild, user_id)
-            name = member.display_name if member else f"User {user_id}"
-            lines.append(f"{idx}. {name}: {count:,} msgs")
-        return "\n".join(lines)
+        return "\n".join(
+            f"{idx}. {names[user_id]}: {count:,} msgs" for idx, (user_id, count) in enumerate(entries, start=1)
+        )
+
+    async def _resolve_names(self, guild: discord.Guild, user_ids: Iterable[int]) -> Dict[int, str]:
+        now = time.monotonic()
+        names: Dict[int, str] = {}
+        misses: List[int] = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member is not None:
+                names[user_id] = member.display_name
+                continue
+            cached = self._member_names.get((guild.id, user_id))
+            if cached is not None and cached[0] > now:
+                names[user_id] = cached[1]
+            else:
+                misses.append(user_id)
+        if misses:
+            # Fetch uncached members concurrently instead of one HTTP round-trip after another
+            members = await asyncio.gather(*(self._safe_fetch_member(guild, user_id) for user_id in misses))
+            for user_id, member in zip(misses, members):
+                if member is None:
+                    names[user_id] = f"User {user_id}"
+                    continue
+                names[user_id] = member.display_name
+                self._cache_name(guild.id, user_id, member.display_name, now)
+        return names
+
+    def _cache_name(self, guild_id: int, user_id: int, name: str, now: float) -> None:
+        key = (guild_id, user_id)
+        self._member_names.pop(key, None)
+        if len(self._member_names) >= MEMBER_NAME_CACHE_SIZE:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del self._member_names[next(iter(self._member_names))]
+        self._member_names[key] = (now + MEMBER_NAME_TTL, name)
 
     async def _safe_fetch_member(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
         try: